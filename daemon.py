@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import stat
+import sys
+from collections import OrderedDict
+
+from nfa_constructor import NFAConstructor
+from nfa_to_dfa import nfa_to_dfa, minimize_dfa, DFATooLargeError, MAX_DFA_STATES
+
+DEFAULT_SOCKET = "/tmp/regex_daemon.sock"
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_LINE_LIMIT = 16 * 1024 * 1024  # longest request line accepted, in bytes
+INLINE_MATCH_LIMIT = 64 * 1024  # DFA batches with more characters than this are matched in the executor
+
+
+def determinize(nfa, max_states=MAX_DFA_STATES):
+    # same pipeline as main.py, but kept in memory instead of going through JSON files
+    nfa.sort_and_rename_states()
+
+    nfa_dict = nfa.export_to_json()
+    start = nfa_dict.pop("startingState")
+    dfa_start, dfa = nfa_to_dfa(start, nfa_dict, max_states)
+    return minimize_dfa(dfa_start, dfa)
+
+
+def match_dfa(start, dfa, text):
+    state = start
+    for char in text:
+        transitions = dfa[state]
+        if char in transitions:
+            state = transitions[char]
+        elif "." in transitions:  # wildcard covers any character without its own transition
+            state = transitions["."]
+        else:
+            return False
+    return dfa[state]["isTerminatingState"]
+
+
+def compile_matcher(regex):
+    # large counted repetitions and patterns whose DFA blows up are simulated on the NFA,
+    # everything else is matched on the minimized DFA
+    constructor = NFAConstructor(counting=True)
+    nfa = constructor.construct_nfa(regex)
+    if nfa.has_counters():
+        return simulation_matcher(nfa)
+
+    try:
+        start, dfa = determinize(nfa)
+    except DFATooLargeError:
+        return simulation_matcher(nfa)
+
+    def matcher(text):
+        return match_dfa(start, dfa, text)
+    matcher.simulated = False
+    return matcher
+
+
+def simulation_matcher(nfa):
+    def matcher(text):
+        return nfa.simulate(text)
+    matcher.simulated = True  # cost depends on the NFA as well as the text, so it never runs on the event loop
+    return matcher
+
+
+def match_all(matcher, texts):
+    return [matcher(text) for text in texts]
+
+
+class PatternCache:
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.max_size = max_size
+        self.entries = OrderedDict()  # regex -> matcher, least recently used first
+        self.pending = {}  # regex -> future of a compilation running in the executor
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, regex):
+        if regex in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(regex)
+            return self.entries[regex]
+
+        self.misses += 1
+        return self.store(regex, compile_matcher(regex))
+
+    async def fetch(self, regex):
+        # like get, but compiles in the default executor so the event loop keeps serving other clients
+        if regex in self.entries:
+            return self.get(regex)
+
+        if regex not in self.pending:
+            self.misses += 1
+            loop = asyncio.get_running_loop()
+            self.pending[regex] = loop.run_in_executor(None, compile_matcher, regex)
+        else:
+            self.hits += 1  # another request is already compiling it
+
+        future = self.pending[regex]
+        try:
+            compiled = await future
+        finally:
+            if self.pending.get(regex) is future:
+                del self.pending[regex]
+        if regex not in self.entries:
+            self.store(regex, compiled)
+        return compiled
+
+    def preload(self, regex):
+        # compiles ahead of any request, so it isn't counted as a hit or a miss
+        if regex not in self.entries:
+            self.store(regex, compile_matcher(regex))
+
+    def store(self, regex, compiled):
+        self.entries[regex] = compiled
+        self.entries.move_to_end(regex)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)  # evict the least recently used pattern
+        return compiled
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, regex):
+        return regex in self.entries
+
+
+async def handle_request(cache, request):
+    '''
+    Requests are JSON objects, e.g.
+        {"id": 1, "op": "compile", "patterns": ["(a|b)*abb", "a+"]}
+        {"id": 2, "op": "match", "pattern": "(a|b)*abb", "texts": ["abb", "ab"]}
+        {"id": 3, "op": "stats"}
+    and a whole JSON list of requests is answered with a list of responses.
+    '''
+    if isinstance(request, list):
+        return [await handle_request(cache, item) for item in request]
+
+    if not isinstance(request, dict):
+        return {"ok": False, "error": "Request must be a JSON object or a list of objects."}
+
+    response = {"id": request.get("id")}
+    try:
+        op = request.get("op")
+        if op == "compile":
+            patterns = request.get("patterns", [request.get("pattern")])
+            for regex in patterns:
+                await cache.fetch(regex)
+            response["compiled"] = len(patterns)
+        elif op == "match":
+            matcher = await cache.fetch(request["pattern"])
+            texts = request.get("texts", [request.get("text")])
+            if matcher.simulated or sum(len(text) for text in texts) > INLINE_MATCH_LIMIT:
+                loop = asyncio.get_running_loop()
+                response["matches"] = await loop.run_in_executor(None, match_all, matcher, texts)
+            else:
+                response["matches"] = match_all(matcher, texts)
+        elif op == "stats":
+            response["size"] = len(cache)
+            response["max_size"] = cache.max_size
+            response["hits"] = cache.hits
+            response["misses"] = cache.misses
+        else:
+            raise ValueError(f"Unknown op '{op}'")
+        response["ok"] = True
+    except Exception as error:  # e.g. a syntax error, RecursionError or MemoryError; only this request fails
+        response["ok"] = False
+        response["error"] = f"{type(error).__name__}: {error}"
+    return response
+
+
+async def read_line(reader):
+    # returns None for a line over the reader's limit, after dropping it
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial  # last line without a newline, or b"" at EOF
+    except asyncio.LimitOverrunError:
+        pass
+
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as error:
+            await reader.readexactly(error.consumed)  # discard what is buffered and keep looking for the newline
+
+
+async def serve_client(cache, reader, writer, limit=DEFAULT_LINE_LIMIT):
+    # one request per line; clients may pipeline many lines without waiting for replies
+    try:
+        while True:
+            line = await read_line(reader)
+            if line is None:
+                response = {"ok": False, "error": f"Request line longer than {limit} bytes"}
+            elif not line:
+                break
+            elif not line.strip():
+                continue
+            else:
+                try:
+                    request = json.loads(line)
+                except (ValueError, RecursionError) as error:  # malformed or too deeply nested JSON
+                    response = {"ok": False, "error": f"Invalid JSON: {error}"}
+                else:
+                    try:
+                        response = await handle_request(cache, request)
+                    except Exception as error:  # e.g. RecursionError on a deeply nested batch
+                        response = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+
+            writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()  # only blocks when the client stops reading its replies
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def start_server(socket_path=DEFAULT_SOCKET, cache_size=DEFAULT_CACHE_SIZE, cache=None, limit=DEFAULT_LINE_LIMIT):
+    if cache is None:
+        cache = PatternCache(cache_size)
+    remove_stale_socket(socket_path)
+
+    return await asyncio.start_unix_server(
+        lambda reader, writer: serve_client(cache, reader, writer, limit),
+        path=socket_path,
+        limit=limit,
+    )
+
+
+def remove_stale_socket(socket_path):
+    # only a socket nobody listens on any more may be replaced, anything else is left alone
+    if not os.path.lexists(socket_path):
+        return
+    if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket")
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.remove(socket_path)  # stale socket from a previous run
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"Another server is already listening on {socket_path}")
+
+
+def remove_own_socket(socket_path, inode):
+    # the path may have been replaced since we bound it, so only remove the socket we created
+    try:
+        if os.lstat(socket_path).st_ino == inode:
+            os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+
+
+def preload_patterns(cache, lines):
+    # bad lines are reported and skipped so one typo doesn't keep the daemon from starting
+    skipped = 0
+    for line_number, line in enumerate(lines, 1):
+        regex = line.strip()
+        if not regex:
+            continue
+        try:
+            cache.preload(regex)
+        except Exception as error:
+            skipped += 1
+            print(f"[✗] Skipping preload line {line_number} '{regex}': {type(error).__name__}: {error}", file=sys.stderr)
+    return skipped
+
+
+async def run(socket_path, cache_size, preload):
+    cache = PatternCache(cache_size)
+    preload_patterns(cache, preload)
+
+    server = await start_server(socket_path, cache=cache)
+    inode = os.lstat(socket_path).st_ino
+    print(f"[✓] Listening on {socket_path} ({len(cache)} patterns preloaded)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        remove_own_socket(socket_path, inode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve regex compile and match requests over a Unix socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="path of the Unix socket to listen on")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="maximum number of compiled patterns kept in memory")
+    parser.add_argument("--preload", metavar="FILE", help="file of regexes (one per line) to compile on startup")
+    args = parser.parse_args()
+
+    preload = []
+    if args.preload:
+        with open(args.preload, "r") as file:
+            preload = file.readlines()
+
+    try:
+        asyncio.run(run(args.socket, args.cache_size, preload))
+    except KeyboardInterrupt:
+        pass
+    except FileExistsError as error:
+        parser.exit(1, f"[✗] {error}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import socket
+import tempfile
+import unittest
+from daemon import PatternCache, determinize, compile_matcher, match_dfa, handle_request, start_server, remove_stale_socket, preload_patterns
+from nfa_constructor import NFAConstructor
+from nfa_to_dfa import DFATooLargeError
+
+def compile_pattern(regex):
+    # DFA only, without the counting mode and simulation fallback compile_matcher adds
+    return determinize(NFAConstructor().construct_nfa(regex))
+
+class TestMatching(unittest.TestCase):
+    def test_match_cases(self):
+        test_cases = [
+            ("(a|b)*abb", [("abb", True), ("aababb", True), ("ab", False), ("abba", False), ("", False)]),
+            ("ab*c+", [("ac", True), ("abbbcc", True), ("ab", False)]),
+            ("a*b*", [("", True), ("aab", True), ("ba", False)]),
+            ("[a-cA-C0-3]+", [("aC3", True), ("d", False)]),
+            ("a.?b", [("ab", True), ("axb", True), ("axyb", False)]),
+        ]
+        for regex, cases in test_cases:
+            start, dfa = compile_pattern(regex)
+            for text, expected in cases:
+                with self.subTest(f"{regex} on '{text}'"):
+                    self.assertEqual(match_dfa(start, dfa, text), expected)
+
+    def test_wildcard_overlapping_literal(self):
+        # '.' has to be followed on 'a' too, not only on characters without a transition of their own
+        test_cases = [
+            ("(.b)|(ac)", [("ab", True), ("ac", True), ("xb", True), ("xc", False)]),
+            ("ab|.c", [("ab", True), ("ac", True), ("zc", True), ("zb", False)]),
+        ]
+        for regex, cases in test_cases:
+            start, dfa = compile_pattern(regex)
+            for text, expected in cases:
+                with self.subTest(f"{regex} on '{text}'"):
+                    self.assertEqual(match_dfa(start, dfa, text), expected)
+
+        # the DFA and the counter simulation have to agree
+        self.assertTrue(compile_matcher("(.b|ac){1}")("ab"))
+        self.assertTrue(compile_matcher("(.b|ac){400}")("ab" * 400))  # over MAX_UNROLLED_STATES, so counters
+
+    def test_dfa_blowup_falls_back_to_simulation(self):
+        # the DFA needs 2^15 states; compiling gives up at MAX_DFA_STATES and simulates the NFA instead
+        with self.assertRaises(DFATooLargeError):
+            compile_pattern("(a|b)*a(a|b){14}")
+        matcher = compile_matcher("(a|b)*a(a|b){14}")
+        self.assertTrue(matcher("bba" + "b" * 14))
+        self.assertFalse(matcher("bbb" + "b" * 14))
+
+
+class TestCompileMatcher(unittest.TestCase):
+    test_cases = [
+        ("a{3}", [("aa", False), ("aaa", True), ("aaaa", False)]),
+        ("x{0}y", [("y", True), ("xy", False)]),
+        ("(ab){2,}c", [("abc", False), ("ababc", True), ("abababababc", True)]),
+        ("[0-9a-f]{4,16}", [("abc", False), ("abcd", True), ("0123456789abcdef", True), ("0123456789abcdef0", False), ("abcg", False)]),
+        ("x[0-9]{0,40}y", [("xy", True), ("x" + "1" * 40 + "y", True), ("x" + "1" * 41 + "y", False)]),
+        ("a{2,5000}b", [("ab", False), ("aab", True), ("a" * 5000 + "b", True), ("a" * 5001 + "b", False)]),
+        ("(a{40}){2,}", [("a" * 79, False), ("a" * 80, True), ("a" * 121, False), ("a" * 400, True)]),
+        ("(a?){50}b", [("b", True), ("a" * 50 + "b", True), ("a" * 51 + "b", False)]),
+        ("a?{2}", [("", True), ("a", True), ("aa", True), ("aaa", False)]),
+        ("xa+{2}", [("xa", False), ("xaa", True), ("xaaa", True)]),
+    ]
+
+    def test_matcher_cases(self):
+        for regex, cases in self.test_cases:
+            matcher = compile_matcher(regex)
+            for text, expected in cases:
+                with self.subTest(f"{regex} on '{text[:20]}' ({len(text)} chars)"):
+                    self.assertEqual(matcher(text), expected)
+
+    def test_dfa_grows_linearly(self):
+        # nested optional copies keep the minimized DFA at one state per possible count
+        start, dfa = compile_pattern("[0-9a-f]{4,16}")
+        self.assertEqual(len(dfa), 17)
+
+    def test_unroll_cap(self):
+        # DFA-only compilation refuses what would take seconds, the matcher switches to counters instead
+        with self.assertRaises(ValueError):
+            compile_pattern("a{2000}")
+        matcher = compile_matcher("a{2000}")
+        self.assertTrue(matcher("a" * 2000))
+        self.assertFalse(matcher("a" * 1999))
+
+
+class TestPatternCache(unittest.TestCase):
+    def test_hits_and_eviction(self):
+        cache = PatternCache(max_size=2)
+        first = cache.get("a+")
+        self.assertIs(cache.get("a+"), first)
+        cache.get("b+")
+        cache.get("a+")  # refresh a+ so b+ becomes the least recently used
+        cache.get("c+")
+        self.assertIn("a+", cache)
+        self.assertNotIn("b+", cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+    def test_preload(self):
+        cache = PatternCache()
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            skipped = preload_patterns(cache, ["a+\n", "\n", "a(\n", "(a|b)*abb\n"])
+        self.assertEqual(skipped, 1)
+        self.assertIn("line 3", errors.getvalue())
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        cache.get("a+")
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            PatternCache(max_size=0)
+
+
+class TestRequests(unittest.TestCase):
+    def test_batched_requests(self):
+        cache = PatternCache()
+        responses = asyncio.run(handle_request(cache, [
+            {"id": 1, "op": "compile", "patterns": ["(a|b)*abb", "a+"]},
+            {"id": 2, "op": "match", "pattern": "(a|b)*abb", "texts": ["abb", "ab"]},
+            {"id": 3, "op": "match", "pattern": "a(", "text": "a"},
+            {"id": 4, "op": "unknown"},
+        ]))
+        self.assertEqual(responses[0], {"id": 1, "compiled": 2, "ok": True})
+        self.assertEqual(responses[1], {"id": 2, "matches": [True, False], "ok": True})
+        self.assertFalse(responses[2]["ok"])
+        self.assertFalse(responses[3]["ok"])
+        self.assertEqual(cache.misses, 3)
+
+    def test_concurrent_fetches_compile_once(self):
+        async def fetch_twice(cache):
+            return await asyncio.gather(cache.fetch("(a|b)*abb"), cache.fetch("(a|b)*abb"))
+
+        cache = PatternCache()
+        first, second = asyncio.run(fetch_twice(cache))
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def exchange(self, payload, reply_count, **server_options):
+        async def run(socket_path):
+            server = await start_server(socket_path, **server_options)
+            async with server:
+                reader, writer = await asyncio.open_unix_connection(socket_path, limit=2 ** 24)
+                writer.write(payload)
+                await writer.drain()
+                replies = [json.loads(await reader.readline()) for _ in range(reply_count)]
+                writer.write_eof()
+                await reader.read()  # wait for the server to close its end
+                writer.close()
+                await writer.wait_closed()
+            return replies
+
+        with tempfile.TemporaryDirectory() as folder:
+            return asyncio.run(run(os.path.join(folder, "daemon.sock")))
+
+    def test_pipelined_socket_requests(self):
+        requests = [{"id": i, "op": "match", "pattern": "ab*", "text": "a" + "b" * i} for i in range(3)]
+        requests.append({"id": 3, "op": "stats"})
+        payload = b"".join(json.dumps(r).encode() + b"\n" for r in requests) + b"not json\n"
+        replies = self.exchange(payload, len(requests) + 1)
+
+        self.assertEqual([r["matches"] for r in replies[:3]], [[True], [True], [True]])
+        self.assertEqual((replies[3]["hits"], replies[3]["misses"]), (2, 1))
+        self.assertFalse(replies[4]["ok"])
+
+    def test_bad_requests_keep_the_connection(self):
+        nested = b"[" * 100000 + b"]" * 100000
+        valid = json.dumps({"id": 2, "op": "match", "pattern": "a+", "text": "aa"}).encode()
+        replies = self.exchange(nested + b"\n" + b'{"id": 1, "op": "match", "pattern": "a(", "text": "a"}\n' + valid + b"\n", 3)
+        self.assertFalse(replies[0]["ok"])
+        self.assertFalse(replies[1]["ok"])
+        self.assertEqual(replies[2], {"id": 2, "matches": [True], "ok": True})
+
+    def test_slow_match_does_not_block_other_clients(self):
+        async def run(socket_path):
+            server = await start_server(socket_path)
+            async with server:
+                slow_reader, slow_writer = await asyncio.open_unix_connection(socket_path, limit=2 ** 24)
+                fast_reader, fast_writer = await asyncio.open_unix_connection(socket_path)
+
+                # simulated on the NFA since its DFA is too large; random text so simulate can't reuse closures
+                text = "".join(random.Random(0).choices("ab", k=50000))
+                slow = {"id": 1, "op": "match", "pattern": "(a|b)*a(a|b){14}", "texts": [text]}
+                slow_writer.write(json.dumps(slow).encode() + b"\n")
+                await slow_writer.drain()
+                slow_reply = asyncio.create_task(slow_reader.readline())
+                await asyncio.sleep(0.1)  # let the slow match start
+
+                fast_writer.write(json.dumps({"id": 2, "op": "match", "pattern": "a+", "text": "aa"}).encode() + b"\n")
+                await fast_writer.drain()
+                fast_reply = json.loads(await fast_reader.readline())
+                slow_still_running = not slow_reply.done()
+                slow_reply = json.loads(await slow_reply)
+
+                for reader, writer in [(slow_reader, slow_writer), (fast_reader, fast_writer)]:
+                    writer.write_eof()
+                    await reader.read()
+                    writer.close()
+                    await writer.wait_closed()
+            return fast_reply, slow_still_running, slow_reply
+
+        with tempfile.TemporaryDirectory() as folder:
+            fast_reply, slow_still_running, slow_reply = asyncio.run(run(os.path.join(folder, "daemon.sock")))
+
+        self.assertEqual(fast_reply, {"id": 2, "matches": [True], "ok": True})
+        self.assertTrue(slow_still_running)
+        self.assertTrue(slow_reply["ok"])
+
+    def test_large_batch(self):
+        # well over asyncio's default 64 KiB line limit
+        request = {"id": 1, "op": "match", "pattern": "a+", "texts": ["a" * 100] * 1000}
+        replies = self.exchange(json.dumps(request).encode() + b"\n", 1)
+        self.assertEqual(replies[0]["matches"], [True] * 1000)
+
+    def test_oversized_line(self):
+        oversized = json.dumps({"id": 1, "op": "match", "pattern": "a+", "texts": ["a" * 100] * 50}).encode()
+        valid = json.dumps({"id": 2, "op": "match", "pattern": "a+", "text": "aa"}).encode()
+        replies = self.exchange(oversized + b"\n" + valid + b"\n", 2, limit=1024)
+        self.assertFalse(replies[0]["ok"])
+        self.assertEqual(replies[1], {"id": 2, "matches": [True], "ok": True})
+
+
+
+class TestSocketPath(unittest.TestCase):
+    def test_regular_file_is_kept(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "victim.txt")
+            with open(path, "w") as file:
+                file.write("data")
+            with self.assertRaises(FileExistsError):
+                asyncio.run(start_server(path))
+            with open(path) as file:
+                self.assertEqual(file.read(), "data")
+
+    def test_live_socket_is_kept(self):
+        async def start_twice(path):
+            server = await start_server(path)
+            async with server:
+                with self.assertRaises(FileExistsError):
+                    await start_server(path)
+                reader, writer = await asyncio.open_unix_connection(path)  # the first server still answers
+                writer.write(b'{"id": 1, "op": "stats"}\n')
+                reply = json.loads(await reader.readline())
+                writer.write_eof()
+                await reader.read()
+                writer.close()
+                await writer.wait_closed()
+            return reply
+
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertTrue(asyncio.run(start_twice(os.path.join(folder, "daemon.sock")))["ok"])
+
+    def test_stale_socket_is_replaced(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "daemon.sock")
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(path)  # bound but never listening, like a socket left behind by a crash
+            stale.close()
+            remove_stale_socket(path)
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,4 @@
-from nfa import NFA, Edge
+from nfa import NFA, Edge, CounterEdge
 
 EPSILON = 'ε'
 
@@ -69,3 +69,79 @@ def handle_or(nfa1, nfa2):
 
     new_nfa = NFA(nfa1.constructor, [start_state, accept_state] + nfa1.states + nfa2.states, start_state, [accept_state], {"S0": [("A", "S1"), ("B", "S0")]})
     return new_nfa
+
+
+def copy_nfa(nfa):
+    # fresh states (and counters) with the same transitions, so a sub-NFA can be used more than once
+    state_map = {stat: nfa.constructor.new_state() for stat in nfa.states}
+    counter_map = {}
+
+    for stat in nfa.states:
+        for edg in stat.outgoing_edges:
+            to_state = state_map[edg.to_state]
+            if isinstance(edg, CounterEdge):
+                if edg.counter not in counter_map:
+                    counter_map[edg.counter] = nfa.constructor.new_counter()
+                new_edge = CounterEdge(counter_map[edg.counter], edg.action, edg.min_count, edg.max_count, to_state)
+            else:
+                new_edge = Edge(edg.symbol, to_state)
+            state_map[stat].add_edge(new_edge)
+
+    new_nfa = NFA(nfa.constructor, [state_map[stat] for stat in nfa.states], state_map[nfa.start_state], [state_map[nfa.accept_states[0]]], {"S0": [("A", "S1"), ("B", "S0")]})
+    return new_nfa
+
+def handle_repetition(nfa, min_count, max_count):
+    if max_count == 0:
+        start_state = nfa.constructor.new_state()
+        accept_state = nfa.constructor.new_state()
+        start_state.add_edge(Edge(EPSILON, accept_state))
+        return NFA(nfa.constructor, [start_state, accept_state], start_state, [accept_state], {"S0": [("A", "S1"), ("B", "S0")]})
+
+    if max_count is None and min_count == 0:
+        return handle_kleene(nfa)
+
+    # copy before linking anything, otherwise the copies would inherit the new edges
+    copies = max_count if max_count is not None else min_count
+    pieces = [nfa] + [copy_nfa(nfa) for _ in range(copies - 1)]
+    required = pieces[:min_count]
+    optional = pieces[min_count:]
+    if max_count is None:
+        required[-1] = handle_plus(required[-1])  # x{m,} is m-1 copies of x followed by x+
+
+    start_state = nfa.constructor.new_state()
+    accept_state = nfa.constructor.new_state()
+    states = [start_state, accept_state]
+
+    # required copies are simply chained
+    current = start_state
+    for piece in required:
+        current.add_edge(Edge(EPSILON, piece.start_state))
+        current = piece.accept_states[0]
+        states += piece.states
+
+    # optional copies are nested, x(x(x)?)? rather than x?x?x?, so every copy shares one exit
+    # and the DFA only grows linearly with max_count
+    for piece in optional:
+        current.add_edge(Edge(EPSILON, accept_state))
+        current.add_edge(Edge(EPSILON, piece.start_state))
+        current = piece.accept_states[0]
+        states += piece.states
+    current.add_edge(Edge(EPSILON, accept_state))
+
+    new_nfa = NFA(nfa.constructor, states, start_state, [accept_state], {"S0": [("A", "S1"), ("B", "S0")]})
+    return new_nfa
+
+def handle_counted_repetition(nfa, min_count, max_count):
+    counter = nfa.constructor.new_counter()
+    start_state = nfa.constructor.new_state()
+    accept_state = nfa.constructor.new_state()
+
+    # the sub-NFA is used once, a counter keeps track of the iterations instead
+    if min_count == 0:
+        start_state.add_edge(Edge(EPSILON, accept_state))
+    start_state.add_edge(CounterEdge(counter, "reset", min_count, max_count, nfa.start_state))
+    nfa.accept_states[0].add_edge(CounterEdge(counter, "loop", min_count, max_count, nfa.start_state))
+    nfa.accept_states[0].add_edge(CounterEdge(counter, "exit", min_count, max_count, accept_state))
+
+    new_nfa = NFA(nfa.constructor, [start_state, accept_state] + nfa.states, start_state, [accept_state], {"S0": [("A", "S1"), ("B", "S0")]})
+    return new_nfa
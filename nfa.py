@@ -1,7 +1,7 @@
 import json
-import graphviz
 
 EPSILON = 'ε'
+MAX_CACHED_CLOSURES = 4096  # per simulate call, bounds memory when counters keep producing new values
 
 
 class Edge:
@@ -13,6 +13,52 @@ class Edge:
         return f"({self.symbol}, {self.to_state.state_id})"
 
 
+class CounterEdge(Edge):
+    '''
+    Epsilon edge of a counted repetition {min_count,max_count} that is simulated
+    instead of unrolled. The action is one of
+        "reset": entering the repetition, the counter starts at 0
+        "loop":  one more iteration finished, run the body again
+        "exit":  one more iteration finished, leave the repetition
+    '''
+    def __init__(self, counter, action, min_count, max_count, to_state):
+        super().__init__(EPSILON, to_state)
+        self.counter = counter
+        self.action = action
+        self.min_count = min_count
+        self.max_count = max_count
+
+    def apply(self, outer, values):
+        # values is a bitmask of the innermost counter's possible values (bit v set = value v), outer holds
+        # one value for each enclosing counter; returns the (outer, values) pairs the edge leads to
+        if self.action == "reset":
+            pairs = []
+            while values:  # every current value of the enclosing counter starts its own inner count
+                lowest = values & -values
+                pairs.append((outer + (lowest.bit_length() - 1,), 1))
+                values ^= lowest
+            return pairs
+
+        values <<= 1  # one more iteration for every value at once
+        if self.action == "loop":
+            if self.max_count is None:
+                # unbounded: only need to know once min is reached, so higher values collapse onto it
+                reached = values >> self.min_count
+                values &= (1 << self.min_count) - 1
+                if reached:
+                    values |= 1 << self.min_count
+            else:
+                values &= (1 << self.max_count) - 1
+            return [(outer, values)] if values else []
+
+        if values >> self.min_count:
+            return [(outer[:-1], 1 << outer[-1])]
+        return []
+
+    def __repr__(self):
+        return f"({self.symbol}:{self.action} c{self.counter}, {self.to_state.state_id})"
+
+
 class State:
     def __init__(self, state_id):
         self.state_id = state_id
@@ -44,9 +90,74 @@ class NFA:
         self.sorted_states = sorted(self.states)
         self.states_sorted = True
 
+    def has_counters(self):
+        return any(isinstance(edg, CounterEdge) for stat in self.states for edg in stat.outgoing_edges)
+
+    def epsilon_reach(self, stat, reach_cache):
+        # states reachable from stat through plain epsilon edges, and the counter edges leaving them
+        if stat not in reach_cache:
+            states = {stat}
+            counter_edges = []
+            stack = [stat]
+            while stack:
+                for edg in stack.pop().outgoing_edges:
+                    if isinstance(edg, CounterEdge):
+                        counter_edges.append(edg)
+                    elif edg.symbol == EPSILON and edg.to_state not in states:
+                        states.add(edg.to_state)
+                        stack.append(edg.to_state)
+            reach_cache[stat] = (tuple(states), tuple(counter_edges))
+        return reach_cache[stat]
+
+    def epsilon_closure(self, configurations, reach_cache=None):
+        # configurations maps (state, outer counter values) to a bitmask of the innermost counter's values;
+        # outside every repetition there is a single implicit counter that is always 0
+        if reach_cache is None:
+            reach_cache = {}
+        closure = {}
+        stack = list(configurations.items())
+        while stack:
+            (stat, outer), values = stack.pop()
+            states, counter_edges = self.epsilon_reach(stat, reach_cache)
+            for reached in states:
+                key = (reached, outer)
+                closure[key] = closure.get(key, 0) | values
+            for edg in counter_edges:
+                for next_outer, next_values in edg.apply(outer, values):
+                    key = (edg.to_state, next_outer)
+                    added = next_values & ~closure.get(key, 0)
+                    if added:  # only the new values need to be followed further
+                        stack.append((key, added))
+        return closure
+
+    def simulate(self, text):
+        # runs the NFA directly, so counted repetitions never have to be unrolled or determinized
+        reach_cache = {}
+        current = self.epsilon_closure({(self.start_state, ()): 1}, reach_cache)
+        closures = {}  # moved configurations -> their closure, so repeated steps are looked up like DFA states
+        for char in text:
+            moved = {}
+            for (stat, outer), values in current.items():
+                for edg in stat.outgoing_edges:
+                    if edg.symbol != EPSILON and (edg.symbol == char or edg.symbol == '.'):  # '.' is the wildcard
+                        key = (edg.to_state, outer)
+                        moved[key] = moved.get(key, 0) | values
+            if not moved:
+                return False
+
+            moved_key = frozenset(moved.items())
+            current = closures.get(moved_key)
+            if current is None:
+                current = self.epsilon_closure(moved, reach_cache)
+                if len(closures) < MAX_CACHED_CLOSURES:
+                    closures[moved_key] = current
+        return any(stat in self.accept_states for stat, _ in current)
+
     def export_to_json(self, file_path=None):
         if not self.states_sorted:
             raise ValueError("States are not sorted. Call `sort_and_rename_states` before exporting to JSON.")
+        if self.has_counters():
+            raise ValueError("NFA uses counted repetitions and can only be simulated. Build it without counting to export it.")
 
         outputJson = dict()
         outputJson["startingState"] = self.start_state.label
@@ -77,6 +188,8 @@ class NFA:
             return outputJson 
 
     def visualize(self, file_path):
+        import graphviz  # imported lazily so matching-only users don't pay for it
+
         gra = graphviz.Digraph(graph_attr={'rankdir': 'LR'})
 
         for stat in self.states:
@@ -0,0 +1,112 @@
+import time
+import unittest
+from nfa import CounterEdge
+from nfa_constructor import NFAConstructor
+from helpers import handle_repetition, handle_counted_repetition, handle_concatenation, copy_nfa
+
+def counters_of(nfa):
+    return {edg.counter for stat in nfa.states for edg in stat.outgoing_edges if isinstance(edg, CounterEdge)}
+
+class TestHandleRepetition(unittest.TestCase):
+    test_cases = [
+        ((3, 3), [("aa", False), ("aaa", True), ("aaaa", False)]),
+        ((0, 0), [("", True), ("a", False)]),
+        ((0, 2), [("", True), ("aa", True), ("aaa", False)]),
+        ((2, 4), [("a", False), ("aa", True), ("aaaa", True), ("aaaaa", False)]),
+        ((2, None), [("a", False), ("aa", True), ("a" * 10, True)]),
+        ((0, None), [("", True), ("a" * 10, True)]),
+    ]
+
+    def test_repetition_cases(self):
+        for (min_count, max_count), cases in self.test_cases:
+            constructor = NFAConstructor()
+            nfa = handle_repetition(constructor.construct_nfa_for_literal('a'), min_count, max_count)
+            self.assertFalse(nfa.has_counters())
+            for text, expected in cases:
+                with self.subTest(f"a{{{min_count},{max_count}}} on '{text}'"):
+                    self.assertEqual(nfa.simulate(text), expected)
+
+    def test_unrolled_size(self):
+        # one copy of the sub-NFA per possible iteration plus a new start and accept
+        constructor = NFAConstructor()
+        nfa = handle_repetition(constructor.construct_nfa_for_literal('a'), 2, 4)
+        self.assertEqual(len(nfa.states), 4 * 2 + 2)
+        self.assertEqual(len(set(nfa.states)), len(nfa.states))
+
+
+class TestHandleCountedRepetition(unittest.TestCase):
+    test_cases = [
+        ((3, 3), [("aa", False), ("aaa", True), ("aaaa", False)]),
+        ((0, 2), [("", True), ("aa", True), ("aaa", False)]),
+        ((2, 4), [("a", False), ("aa", True), ("aaaa", True), ("aaaaa", False)]),
+        ((2, None), [("a", False), ("aa", True), ("a" * 10, True)]),
+    ]
+
+    def test_counted_repetition_cases(self):
+        for (min_count, max_count), cases in self.test_cases:
+            constructor = NFAConstructor(counting=True)
+            nfa = handle_counted_repetition(constructor.construct_nfa_for_literal('a'), min_count, max_count)
+            self.assertTrue(nfa.has_counters())
+            self.assertEqual(len(nfa.states), 4)  # the sub-NFA is never copied
+            for text, expected in cases:
+                with self.subTest(f"a{{{min_count},{max_count}}} on '{text}'"):
+                    self.assertEqual(nfa.simulate(text), expected)
+
+    def test_nested_counters(self):
+        # (ab{2,3}){2}: the inner counter has to start over on every outer iteration
+        constructor = NFAConstructor(counting=True)
+        inner = handle_counted_repetition(constructor.construct_nfa_for_literal('b'), 2, 3)
+        body = handle_concatenation(constructor.construct_nfa_for_literal('a'), inner)
+        nfa = handle_counted_repetition(body, 2, 2)
+        self.assertEqual(len(counters_of(nfa)), 2)
+
+        cases = [("abbabbb", True), ("abbbabb", True), ("abbabb", True), ("abbbbabb", False), ("abab", False), ("abb", False)]
+        for text, expected in cases:
+            with self.subTest(text):
+                self.assertEqual(nfa.simulate(text), expected)
+
+    def test_large_bound_on_long_input(self):
+        # all values of a counter move together, so a bound of 3000 doesn't cost 3000 configurations per character
+        nfa = NFAConstructor(counting=True).construct_nfa("(a|b)*a(a|b){3000}")
+        self.assertTrue(nfa.has_counters())
+
+        started = time.perf_counter()
+        self.assertTrue(nfa.simulate("ab" * 5000 + "a" + "b" * 3000))
+        self.assertFalse(nfa.simulate("ab" * 5000 + "a" + "b" * 2999))
+        self.assertFalse(nfa.simulate("b" * 10000 + "a" + "b" * 3001))
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_export_refuses_counters(self):
+        constructor = NFAConstructor(counting=True)
+        nfa = handle_counted_repetition(constructor.construct_nfa_for_literal('a'), 2, 3)
+        nfa.sort_and_rename_states()
+        with self.assertRaises(ValueError):
+            nfa.export_to_json()
+
+
+class TestCopyNFA(unittest.TestCase):
+    def test_copy_remaps_states_and_counters(self):
+        constructor = NFAConstructor(counting=True)
+        nfa = handle_counted_repetition(constructor.construct_nfa_for_literal('a'), 2, 3)
+        copy = copy_nfa(nfa)
+
+        self.assertFalse(set(nfa.states) & set(copy.states))
+        self.assertEqual(len(counters_of(copy)), 1)
+        self.assertFalse(counters_of(nfa) & counters_of(copy))
+        for text in ["a", "aa", "aaa", "aaaa"]:
+            with self.subTest(text):
+                self.assertEqual(copy.simulate(text), nfa.simulate(text))
+
+    def test_unrolled_counters_stay_independent(self):
+        # a{1500} is over MAX_UNROLLED_STATES so it gets a counter, and {2,} then copies it
+        nfa = NFAConstructor(counting=True).construct_nfa("(a{1500}){2,}")
+        self.assertEqual(len(counters_of(nfa)), 2)
+
+        cases = [(2999, False), (3000, True), (4499, False), (4500, True), (4501, False)]
+        for length, expected in cases:
+            with self.subTest(length):
+                self.assertEqual(nfa.simulate("a" * length), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
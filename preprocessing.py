@@ -1,3 +1,4 @@
+import re
 import string
 
 
@@ -17,6 +18,14 @@ def tokenize(regex):
             expanded = expand_lists(bracket_token)  
             tokens.extend(tokenize(expanded))  # recursively tokenize the expanded characters
             i = j + 1
+        elif char == '{':
+            j = regex.find('}', i)
+            if j == -1:
+                raise ValueError("Unclosed repetition '{'")
+            repetition_token = regex[i:j+1]
+            parse_repetition(repetition_token)  # validate the bounds early
+            tokens.append(repetition_token)
+            i = j + 1
         elif char in {'(', ')', '*', '+', '?', '|', '.'}:
             tokens.append(char)
             i += 1
@@ -28,6 +37,27 @@ def tokenize(regex):
     
     return tokens
 
+def is_repetition(token):
+    return token.startswith('{') and token.endswith('}')
+
+def parse_repetition(token):
+    # {m} -> (m, m), {m,} -> (m, None), {m,n} -> (m, n)
+    match = re.fullmatch(r'\{(\d+)(,(\d*))?\}', token)
+    if not match:
+        raise ValueError(f"Invalid repetition '{token}'")
+
+    min_count = int(match.group(1))
+    if match.group(2) is None:
+        max_count = min_count
+    elif match.group(3) == '':
+        max_count = None
+    else:
+        max_count = int(match.group(3))
+
+    if max_count is not None and max_count < min_count:
+        raise ValueError(f"Invalid repetition '{token}': {min_count} is greater than {max_count}")
+    return min_count, max_count
+
 def expand_lists(token):
     allowed_range = set(string.ascii_letters + string.digits)
 
@@ -67,7 +97,7 @@ def insert_concatenation_operators(tokens):
 
         # insert a concatenation operator if the current and next tokens should be concatenated
         if (
-            (current.isalnum() or current in [')', '*', '+', '?', '.']) and
+            (current.isalnum() or current in [')', '*', '+', '?', '.'] or is_repetition(current)) and
             (next_char.isalnum() or next_char in ['(', '[', '.'])
         ):
             result.append('#')
@@ -95,7 +125,7 @@ def infix_to_postfix(tokens):
     operators = []
 
     for i in range(1, len(tokens)):
-        if tokens[i-1] not in precedence and tokens[i] not in precedence and tokens[i-1] != '(' and tokens[i] != ')':
+        if tokens[i-1] not in precedence and tokens[i] not in precedence and tokens[i-1] != '(' and tokens[i] != ')' and not is_repetition(tokens[i]):
             tokens.insert(i, '#')
 
     for token in tokens:
@@ -111,6 +141,10 @@ def infix_to_postfix(tokens):
             operators.pop()
         elif token == '*':
             output.append(token)
+        elif is_repetition(token):
+            while operators and operators[-1] in {'+', '?'}:  # postfix operators it applies on top of
+                output.append(operators.pop())
+            output.append(token)
         elif token in precedence:
             while operators and operators[-1] != '(' and precedence[token] <= precedence.get(operators[-1], 0):
                 output.append(operators.pop())
@@ -1,6 +1,6 @@
 import string
 import unittest
-from preprocessing import infix_to_postfix, insert_concatenation_operators, tokenize , expand_lists
+from preprocessing import infix_to_postfix, insert_concatenation_operators, tokenize , expand_lists, parse_repetition
 
 class TestRegexTokenizer(unittest.TestCase):
     def test_tokenizer_cases(self):
@@ -15,6 +15,9 @@ class TestRegexTokenizer(unittest.TestCase):
             ("a|b|c", ['a', '|', 'b', '|', 'c']),
             ("([0-9])*", ['(', '(', '0', '|', '1', '|', '2', '|', '3', '|', '4', '|', '5', '|', '6', '|', '7', '|', '8', '|', '9', ')', ')', '*']),
             ("[a-c][0-9]", ['(', 'a', '|', 'b', '|', 'c', ')', '(', '0', '|', '1', '|', '2', '|', '3', '|', '4', '|', '5', '|', '6', '|', '7', '|', '8', '|', '9', ')']),
+            ("a{3}b", ['a', '{3}', 'b']),
+            ("(ab){2,}", ['(', 'a', 'b', ')', '{2,}']),
+            ("[0-1]{4,16}", ['(', '0', '|', '1', ')', '{4,16}']),
         ]
         for i, (regex, expected) in enumerate(test_cases):
             with self.subTest(f"Test case {i+1}: {regex}"):
@@ -25,6 +28,10 @@ class TestRegexTokenizer(unittest.TestCase):
         error_cases = [
             "[abc",    
             "a#b",     
+            "a{2",
+            "a{}",
+            "a{,3}",
+            "a{5,2}",
         ]
 
         for i, regex in enumerate(error_cases):
@@ -33,6 +40,36 @@ class TestRegexTokenizer(unittest.TestCase):
                     tokenize(regex)
 
 
+class TestRepetitionParsing(unittest.TestCase):
+    def test_repetition_cases(self):
+        test_cases = [
+            ("{3}", (3, 3)),
+            ("{0,}", (0, None)),
+            ("{2,5}", (2, 5)),
+            ("{4,4}", (4, 4)),
+        ]
+
+        for i, (token, expected) in enumerate(test_cases):
+            with self.subTest(f"Test case {i+1}: {token}"):
+                self.assertEqual(parse_repetition(token), expected)
+
+    def test_repetition_postfix(self):
+        # repetitions are postfix operators binding tighter than concatenation, like '*'
+        test_cases = [
+            ("a{3}b", ['a', '{3}', 'b', '#']),
+            ("a{2,3}(b|c){4}", ['a', '{2,3}', 'b', 'c', '|', '{4}', '#']),
+            ("(ab){2,}", ['a', 'b', '#', '{2,}']),
+            ("a?{2}", ['a', '?', '{2}']),
+            ("a+{2}", ['a', '+', '{2}']),
+            ("xa+{2}", ['x', 'a', '+', '{2}', '#']),
+        ]
+
+        for i, (regex, expected) in enumerate(test_cases):
+            with self.subTest(f"Test case {i+1}: {regex}"):
+                tokens = insert_concatenation_operators(tokenize(regex))
+                self.assertEqual(infix_to_postfix(tokens), expected)
+
+
 class TestBracketExpansion(unittest.TestCase):
     def test_bracket_expansion_cases(self):
         test_cases = [